@@ -6,6 +6,8 @@ Lightweight API-only deployment settings.
 
 import logging
 import sys
+import time
+from functools import lru_cache
 
 from pydantic_settings import BaseSettings
 
@@ -17,23 +19,48 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def _fetch_aws_secret(secret_name: str) -> str | None:
-    """Fetch a secret value from AWS Secrets Manager.
+# How long fetched secret values stay valid before a re-fetch
+_SECRET_CACHE_TTL = 300.0
 
-    Returns None on any failure (missing boto3, no credentials, etc.).
+# secret_name -> (value, fetched_at); failures are cached too so a broken
+# AWS setup costs one round-trip per secret per TTL, not one per call
+_secret_cache: dict[str, tuple[str | None, float]] = {}
+
+
+@lru_cache(maxsize=1)
+def _get_sm_client():
+    """Build the Secrets Manager client once; boto session init is expensive.
+
+    Returns None when boto3 is not installed.
     """
     try:
         import boto3
-        from botocore.exceptions import ClientError
-    except ImportError:
+        return boto3.client("secretsmanager", region_name="us-east-1")
+    except Exception:
         return None
 
-    try:
-        client = boto3.client("secretsmanager", region_name="us-east-1")
-        response = client.get_secret_value(SecretId=secret_name)
-        return response["SecretString"]
-    except (ClientError, Exception):
-        return None
+
+def _fetch_aws_secret(secret_name: str) -> str | None:
+    """Fetch a secret value from AWS Secrets Manager, memoized with a TTL.
+
+    Returns None on any failure (missing boto3, no credentials, etc.).
+    """
+    now = time.monotonic()
+    cached = _secret_cache.get(secret_name)
+    if cached is not None and now - cached[1] < _SECRET_CACHE_TTL:
+        return cached[0]
+
+    value: str | None = None
+    client = _get_sm_client()
+    if client is not None:
+        try:
+            response = client.get_secret_value(SecretId=secret_name)
+            value = response["SecretString"]
+        except Exception:
+            value = None
+
+    _secret_cache[secret_name] = (value, now)
+    return value
 
 
 class Settings(BaseSettings):
@@ -59,6 +86,7 @@ class Settings(BaseSettings):
     # Rate Limiting
     rate_limit_requests: int = 100  # Requests per minute
     rate_limit_window: int = 60  # Window in seconds
+    redis_url: str = ""  # Shared limiter store; empty = in-process buckets
 
     # Cost Tracking
     monthly_budget_usd: float = 50.0
@@ -4,6 +4,7 @@ OpenClaw Lite Cost Tracker
 Tracks API costs for OpenAI and Claude.
 """
 
+import time
 from datetime import datetime, timezone
 from typing import Any
 
@@ -16,6 +17,14 @@ PRICING = {
     "claude-opus-4-20250514": {"input": 15.00, "output": 75.00},
 }
 
+# Per-token (input, output) rates precomputed so the hot path is one dict
+# lookup and two multiplies
+_PRICING_PER_TOKEN = {
+    model: (rates["input"] / 1e6, rates["output"] / 1e6)
+    for model, rates in PRICING.items()
+}
+_DEFAULT_PER_TOKEN = (1e-6, 1e-6)
+
 
 class CostTracker:
     """Tracks API usage costs."""
@@ -23,24 +32,43 @@ class CostTracker:
     def __init__(self, monthly_budget_usd: float = 50.0):
         self.monthly_budget = monthly_budget_usd
         self._current_month = self._get_month()
+        self._month_valid_until = self._next_month_start()
 
-        # Monthly counters
-        self._monthly_costs = {"openai": 0.0, "claude": 0.0}
-        self._monthly_tokens = {"openai": {"input": 0, "output": 0}, "claude": {"input": 0, "output": 0}}
+        # Monthly counters, flat so each update is one hash lookup
+        self._counters = self._fresh_counters()
 
         # Total counters
         self._total_requests = 0
 
+    @staticmethod
+    def _fresh_counters() -> dict[str, float]:
+        return {
+            "openai_cost": 0.0, "openai_in": 0, "openai_out": 0,
+            "claude_cost": 0.0, "claude_in": 0, "claude_out": 0,
+        }
+
     @staticmethod
     def _get_month() -> str:
         return datetime.now(timezone.utc).strftime("%Y-%m")
 
+    @staticmethod
+    def _next_month_start() -> float:
+        """UNIX timestamp of the first second of next month (UTC)."""
+        now = datetime.now(timezone.utc)
+        if now.month == 12:
+            start = datetime(now.year + 1, 1, 1, tzinfo=timezone.utc)
+        else:
+            start = datetime(now.year, now.month + 1, 1, tzinfo=timezone.utc)
+        return start.timestamp()
+
     def _check_month_rollover(self) -> None:
-        current = self._get_month()
-        if current != self._current_month:
-            self._current_month = current
-            self._monthly_costs = {"openai": 0.0, "claude": 0.0}
-            self._monthly_tokens = {"openai": {"input": 0, "output": 0}, "claude": {"input": 0, "output": 0}}
+        # time.time() is far cheaper than formatting a datetime, so compare
+        # against the precomputed month boundary and only re-format on rollover
+        if time.time() < self._month_valid_until:
+            return
+        self._current_month = self._get_month()
+        self._month_valid_until = self._next_month_start()
+        self._counters = self._fresh_counters()
 
     def track(
         self,
@@ -53,17 +81,17 @@ class CostTracker:
         self._check_month_rollover()
 
         # Get pricing
-        pricing = PRICING.get(model, {"input": 1.0, "output": 1.0})
-        cost = (input_tokens / 1_000_000) * pricing["input"] + \
-               (output_tokens / 1_000_000) * pricing["output"]
+        input_rate, output_rate = _PRICING_PER_TOKEN.get(model, _DEFAULT_PER_TOKEN)
+        cost = input_tokens * input_rate + output_tokens * output_rate
 
         # Update counters
-        self._monthly_costs[provider] += cost
-        self._monthly_tokens[provider]["input"] += input_tokens
-        self._monthly_tokens[provider]["output"] += output_tokens
+        counters = self._counters
+        counters[provider + "_cost"] += cost
+        counters[provider + "_in"] += input_tokens
+        counters[provider + "_out"] += output_tokens
         self._total_requests += 1
 
-        total_cost = self._monthly_costs["openai"] + self._monthly_costs["claude"]
+        total_cost = counters["openai_cost"] + counters["claude_cost"]
 
         return {
             "cost_usd": round(cost, 6),
@@ -74,12 +102,13 @@ class CostTracker:
 
     def is_budget_exceeded(self) -> bool:
         self._check_month_rollover()
-        total = self._monthly_costs["openai"] + self._monthly_costs["claude"]
+        total = self._counters["openai_cost"] + self._counters["claude_cost"]
         return total >= self.monthly_budget
 
     def get_stats(self) -> dict[str, Any]:
         self._check_month_rollover()
-        total_cost = self._monthly_costs["openai"] + self._monthly_costs["claude"]
+        counters = self._counters
+        total_cost = counters["openai_cost"] + counters["claude_cost"]
 
         return {
             "month": self._current_month,
@@ -89,14 +118,14 @@ class CostTracker:
             "budget_utilization_pct": round(total_cost / self.monthly_budget * 100, 2),
             "by_provider": {
                 "openai": {
-                    "cost_usd": round(self._monthly_costs["openai"], 4),
-                    "input_tokens": self._monthly_tokens["openai"]["input"],
-                    "output_tokens": self._monthly_tokens["openai"]["output"],
+                    "cost_usd": round(counters["openai_cost"], 4),
+                    "input_tokens": counters["openai_in"],
+                    "output_tokens": counters["openai_out"],
                 },
                 "claude": {
-                    "cost_usd": round(self._monthly_costs["claude"], 4),
-                    "input_tokens": self._monthly_tokens["claude"]["input"],
-                    "output_tokens": self._monthly_tokens["claude"]["output"],
+                    "cost_usd": round(counters["claude_cost"], 4),
+                    "input_tokens": counters["claude_in"],
+                    "output_tokens": counters["claude_out"],
                 },
             },
             "total_requests": self._total_requests,
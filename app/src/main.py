@@ -4,15 +4,19 @@ OpenClaw Lite - Lightweight API-only LLM Router
 Routes queries between OpenAI (simple/cheap) and Claude (complex/powerful).
 """
 
+import asyncio
+import hmac
 import logging
 import time
-from collections import defaultdict
+from collections import OrderedDict
 from contextlib import asynccontextmanager
 from typing import Any, Literal
 
+import httpx
+import redis.asyncio as aioredis
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
 
 from .config import settings
@@ -30,33 +34,95 @@ logger = logging.getLogger(__name__)
 # Global instances
 query_router: QueryRouter | None = None
 
-# Rate limiting storage
-rate_limit_store: dict[str, list[float]] = defaultdict(list)
+# Max tracked client IPs before the oldest bucket is evicted
+MAX_IPS = 160_000
+
+
+class _LRUBuckets(OrderedDict):
+    """Fixed-capacity store for token buckets, evicting least-recently-seen IPs.
+
+    Caps memory at ~MAX_IPS * 40B regardless of how many unique (or spoofed)
+    client IPs show up; no background cleanup needed.
+    """
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        if len(self) > MAX_IPS:
+            self.popitem(last=False)
+
+
+# Rate limiting storage: per-IP token bucket as (tokens, last_refill).
+# Only used when no Redis URL is configured; with multiple workers each
+# process holds its own buckets, so the effective limit is N x configured.
+rate_limit_store: _LRUBuckets = _LRUBuckets()
+
+# Atomic fixed-window counter: one round-trip per request
+_RATE_LIMIT_LUA = """
+local n = redis.call('INCR', KEYS[1])
+if n == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return n
+"""
+
+# Set in lifespan when settings.redis_url is configured
+_rate_limit_script = None
+
+# Hot-path settings bound once: pydantic-settings attribute access goes
+# through the model's __getattr__ and is not free per request
+_API_KEY = settings.api_key
+_RL_MAX = settings.rate_limit_requests
+_RL_WINDOW = settings.rate_limit_window
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application startup and shutdown."""
-    global query_router
+    global query_router, _rate_limit_script
 
     logger.info(f"Starting OpenClaw Lite v{settings.version}")
 
+    # Shared rate limiting across workers when Redis is configured
+    redis_client = None
+    if settings.redis_url:
+        redis_client = aioredis.from_url(settings.redis_url)
+        _rate_limit_script = redis_client.register_script(_RATE_LIMIT_LUA)
+        logger.info("Rate limiting: redis")
+    else:
+        logger.info("Rate limiting: in-process")
+
+    # One connection pool shared by both SDKs: one set of TLS handshakes,
+    # HTTP/2 multiplexing across providers
+    # Generous read timeout: a 4096-token completion can take minutes
+    http_client = httpx.AsyncClient(
+        http2=True,
+        timeout=httpx.Timeout(300.0, connect=10.0),
+        limits=httpx.Limits(max_keepalive_connections=100),
+    )
+
     # Initialize providers
     openai_provider = OpenAIProvider(
         api_key=settings.openai_api_key,
         model=settings.openai_model,
+        http_client=http_client,
     )
     claude_provider = ClaudeProvider(
         api_key=settings.anthropic_api_key,
         model=settings.claude_model,
+        http_client=http_client,
     )
 
-    # Check availability
-    if not openai_provider.is_available() and not claude_provider.is_available():
+    # Check availability; probes run concurrently so a future health ping
+    # costs max(RTT), not sum
+    openai_ok, claude_ok = await asyncio.gather(
+        openai_provider.health(), claude_provider.health()
+    )
+    if not openai_ok and not claude_ok:
         raise RuntimeError("No API keys configured. Set OPENAI_API_KEY and/or ANTHROPIC_API_KEY")
 
-    logger.info(f"OpenAI ({settings.openai_model}): {'available' if openai_provider.is_available() else 'not configured'}")
-    logger.info(f"Claude ({settings.claude_model}): {'available' if claude_provider.is_available() else 'not configured'}")
+    logger.info(f"OpenAI ({settings.openai_model}): {'available' if openai_ok else 'not configured'}")
+    logger.info(f"Claude ({settings.claude_model}): {'available' if claude_ok else 'not configured'}")
 
     # Initialize router
     cost_tracker = CostTracker(monthly_budget_usd=settings.monthly_budget_usd)
@@ -72,6 +138,9 @@ async def lifespan(app: FastAPI):
 
     yield
 
+    if redis_client is not None:
+        await redis_client.aclose()
+    await http_client.aclose()
     logger.info("Shutting down OpenClaw Lite")
 
 
@@ -81,6 +150,7 @@ app = FastAPI(
     description="Lightweight API router for OpenAI and Claude",
     version=settings.version,
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # CORS
@@ -93,60 +163,69 @@ app.add_middleware(
 )
 
 
-# Rate limiting middleware
-@app.middleware("http")
-async def rate_limit_middleware(request: Request, call_next):
-    if request.url.path.startswith("/v1/"):
-        forwarded_for = request.headers.get("X-Forwarded-For")
-        if forwarded_for:
-            client_ip = forwarded_for.split(",")[0].strip()
-        else:
-            client_ip = request.client.host if request.client else "unknown"
-        now = time.time()
-        window_start = now - settings.rate_limit_window
-
-        # Clean old entries
-        rate_limit_store[client_ip] = [
-            t for t in rate_limit_store[client_ip] if t > window_start
-        ]
-
-        if len(rate_limit_store[client_ip]) >= settings.rate_limit_requests:
-            return JSONResponse(
-                status_code=429,
-                content={"error": "Rate limit exceeded. Try again later."},
-            )
-
-        rate_limit_store[client_ip].append(now)
-
-    return await call_next(request)
-
-
 # Auth paths that don't require API key
-_PUBLIC_PATHS = {"/health", "/", "/docs", "/openapi.json"}
+_PUBLIC_PATHS = frozenset({"/health", "/", "/docs", "/openapi.json"})
 
 
-# API key authentication middleware
+# Gate middleware: API key auth + rate limiting in one pass, so the path
+# is read and prefix-checked once per request
 @app.middleware("http")
-async def auth_middleware(request: Request, call_next):
-    if not settings.api_key:
-        return await call_next(request)
-
-    if request.url.path in _PUBLIC_PATHS:
-        return await call_next(request)
-
-    if not request.url.path.startswith("/v1/"):
+async def gate_middleware(request: Request, call_next):
+    path = request.url.path
+    if not path.startswith("/v1/") or path in _PUBLIC_PATHS:
         return await call_next(request)
 
-    api_key = request.headers.get("X-API-Key") or ""
-    auth_header = request.headers.get("Authorization") or ""
-    if auth_header.startswith("Bearer "):
-        api_key = auth_header[7:]
+    # API key authentication
+    if _API_KEY:
+        api_key = request.headers.get("X-API-Key") or ""
+        auth_header = request.headers.get("Authorization")
+        if auth_header and auth_header.startswith("Bearer "):
+            api_key = auth_header[7:]
+
+        # Constant-time comparison: no timing side channel on key prefixes.
+        # Compare bytes: compare_digest rejects non-ASCII str input.
+        if not hmac.compare_digest(api_key.encode("utf-8"), _API_KEY.encode("utf-8")):
+            return ORJSONResponse(
+                status_code=401,
+                content={"error": "Invalid or missing API key"},
+            )
 
-    if api_key != settings.api_key:
-        return JSONResponse(
-            status_code=401,
-            content={"error": "Invalid or missing API key"},
+    # Rate limiting
+    forwarded_for = request.headers.get("X-Forwarded-For")
+    if forwarded_for:
+        # partition instead of split: no throwaway list of tail entries
+        client_ip = forwarded_for.partition(",")[0].strip()
+    else:
+        client_ip = request.client.host if request.client else "unknown"
+    if _rate_limit_script is not None:
+        # Shared fixed-window counter in Redis: correct across workers
+        count = await _rate_limit_script(
+            keys=[f"ratelimit:{client_ip}"], args=[_RL_WINDOW]
         )
+        if count > _RL_MAX:
+            return ORJSONResponse(
+                status_code=429,
+                content={"error": "Rate limit exceeded. Try again later."},
+            )
+    else:
+        # Monotonic clock: immune to NTP jumps, and bucket timestamps are
+        # only ever compared to each other
+        now = time.monotonic()
+        capacity = _RL_MAX
+        refill_rate = capacity / _RL_WINDOW
+
+        # Refill the bucket based on elapsed time, then try to spend one token
+        prev_tokens, prev_refill = rate_limit_store.get(client_ip, (float(capacity), now))
+        tokens = min(float(capacity), prev_tokens + (now - prev_refill) * refill_rate)
+
+        if tokens < 1.0:
+            rate_limit_store[client_ip] = (tokens, now)
+            return ORJSONResponse(
+                status_code=429,
+                content={"error": "Rate limit exceeded. Try again later."},
+            )
+
+        rate_limit_store[client_ip] = (tokens - 1.0, now)
 
     return await call_next(request)
 
@@ -202,7 +281,8 @@ async def chat_completions(request: ChatRequest):
         raise HTTPException(status_code=503, detail="Service not initialized")
 
     try:
-        messages = [{"role": m.role, "content": m.content} for m in request.messages]
+        # One Rust-level dump instead of rebuilding a dict per message
+        messages = request.model_dump()["messages"]
 
         response = await query_router.route(
             messages=messages,
@@ -215,7 +295,7 @@ async def chat_completions(request: ChatRequest):
             model=response.model,
             content=response.content,
             provider=response.provider,
-            usage=response.usage,
+            usage=response.usage._asdict(),
         )
 
     except Exception as e:
@@ -6,15 +6,25 @@ OpenAI and Claude API integrations.
 
 import logging
 import uuid
-from typing import Any
+from typing import Any, NamedTuple
 
 import anthropic
+import httpx
 import openai
 from pydantic import BaseModel
 
 logger = logging.getLogger(__name__)
 
 
+class Usage(NamedTuple):
+    """Token usage for one completion; attribute reads are C-level slot
+    lookups rather than string-hashed dict access."""
+
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+
+
 class ProviderResponse(BaseModel):
     """Standardized response from any provider."""
 
@@ -22,15 +32,24 @@ class ProviderResponse(BaseModel):
     model: str
     content: str
     provider: str
-    usage: dict[str, int]
+    usage: Usage
 
 
 class OpenAIProvider:
     """OpenAI API provider for simple queries."""
 
-    def __init__(self, api_key: str, model: str = "gpt-4o-mini"):
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "gpt-4o-mini",
+        http_client: httpx.AsyncClient | None = None,
+    ):
         self.model = model
-        self.client = openai.AsyncOpenAI(api_key=api_key) if api_key else None
+        self.client = (
+            openai.AsyncOpenAI(api_key=api_key, http_client=http_client)
+            if api_key
+            else None
+        )
 
     async def generate(
         self,
@@ -53,54 +72,75 @@ class OpenAIProvider:
             model=response.model,
             content=response.choices[0].message.content or "",
             provider="openai",
-            usage={
-                "prompt_tokens": response.usage.prompt_tokens,
-                "completion_tokens": response.usage.completion_tokens,
-                "total_tokens": response.usage.total_tokens,
-            },
+            usage=Usage(
+                prompt_tokens=response.usage.prompt_tokens,
+                completion_tokens=response.usage.completion_tokens,
+                total_tokens=response.usage.total_tokens,
+            ),
         )
 
     def is_available(self) -> bool:
         return self.client is not None
 
+    async def health(self) -> bool:
+        """Readiness probe; currently just checks client presence."""
+        return self.is_available()
+
 
 class ClaudeProvider:
     """Claude API provider for complex queries."""
 
-    def __init__(self, api_key: str, model: str = "claude-sonnet-4-20250514"):
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "claude-sonnet-4-20250514",
+        http_client: httpx.AsyncClient | None = None,
+    ):
         self.model = model
-        self.client = anthropic.AsyncAnthropic(api_key=api_key) if api_key else None
+        self.client = (
+            anthropic.AsyncAnthropic(api_key=api_key, http_client=http_client)
+            if api_key
+            else None
+        )
 
     def _convert_messages(
         self, messages: list[dict[str, Any]]
     ) -> tuple[str | None, list[dict[str, str]]]:
         """Convert OpenAI format to Anthropic format."""
-        system_message = None
-        converted = []
+        system_parts: list[str] = []
+        roles: list[str] = []
+        parts: list[list[str]] = []  # content parts per consecutive-role group
 
+        # Single pass: group consecutive same-role messages as we go, and
+        # join each group once at the end instead of growing strings with +=
         for msg in messages:
             role = msg.get("role", "user")
             content = msg.get("content", "")
 
             if role == "system":
-                system_message = content if not system_message else f"{system_message}\n\n{content}"
-            elif role == "assistant":
-                converted.append({"role": "assistant", "content": content})
+                # Skip empty contents so joining can't fabricate a non-empty
+                # system prompt out of blank messages
+                if content:
+                    system_parts.append(content)
+                continue
+
+            role = "assistant" if role == "assistant" else "user"
+            if roles and roles[-1] == role:
+                parts[-1].append(content)
             else:
-                converted.append({"role": "user", "content": content})
+                roles.append(role)
+                parts.append([content])
+
+        merged = [
+            {"role": role, "content": "\n\n".join(group)}
+            for role, group in zip(roles, parts)
+        ]
 
         # Ensure first message is from user
-        if converted and converted[0]["role"] == "assistant":
-            converted.insert(0, {"role": "user", "content": "Continue."})
-
-        # Merge consecutive same-role messages
-        merged = []
-        for msg in converted:
-            if merged and merged[-1]["role"] == msg["role"]:
-                merged[-1]["content"] += "\n\n" + msg["content"]
-            else:
-                merged.append(msg)
+        if merged and merged[0]["role"] == "assistant":
+            merged.insert(0, {"role": "user", "content": "Continue."})
 
+        system_message = "\n\n".join(system_parts) if system_parts else None
         return system_message, merged
 
     async def generate(
@@ -137,12 +177,16 @@ class ClaudeProvider:
             model=self.model,
             content=content,
             provider="claude",
-            usage={
-                "prompt_tokens": response.usage.input_tokens,
-                "completion_tokens": response.usage.output_tokens,
-                "total_tokens": response.usage.input_tokens + response.usage.output_tokens,
-            },
+            usage=Usage(
+                prompt_tokens=response.usage.input_tokens,
+                completion_tokens=response.usage.output_tokens,
+                total_tokens=response.usage.input_tokens + response.usage.output_tokens,
+            ),
         )
 
     def is_available(self) -> bool:
         return self.client is not None
+
+    async def health(self) -> bool:
+        """Readiness probe; currently just checks client presence."""
+        return self.is_available()